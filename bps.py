@@ -2,27 +2,48 @@
 
 import math
 import hashlib
+import struct
 import time
 from typing import List, Dict, Optional
 from collections import defaultdict
 
+_sha256 = hashlib.sha256
+
+
+def _utxo_id(x, phi_val) -> str:
+    return _sha256(struct.pack("<dd", float(x), float(phi_val))).digest()[:4].hex()
+
+
 # --- Structure UTXO Definition ---
 class StructureUTXO:
-    def __init__(self, x, phi_val, delta, entropy, refs):
+    __slots__ = ('x', 'phi', 'delta', 'entropy', 'refs', 'id', 'locked')
+
+    def __init__(self, x, phi_val, delta, entropy, refs, utxo_id: Optional[str] = None):
         self.x = x
         self.phi = phi_val
         self.delta = delta
         self.entropy = entropy
         self.refs = refs
-        self.id = hashlib.sha256(f"{x}{phi_val}".encode()).hexdigest()[:8]
+        self.id = utxo_id or _utxo_id(x, phi_val)
         self.locked = False
 
     def __repr__(self):
         return f"<ψ-{self.id} | δ={self.delta:.4f} | H={self.entropy:.2f}>"
 
+    @classmethod
+    def create_batch(cls, xs, phi_vals, deltas, entropies, refs_list):
+        # refs_list entries are positions of earlier UTXOs within the same batch
+        ids = [_utxo_id(x, phi_val) for x, phi_val in zip(xs, phi_vals)]
+        return [cls(x, phi_val, delta, entropy, [ids[r] for r in refs], utxo_id=utxo_id)
+                for x, phi_val, delta, entropy, refs, utxo_id
+                in zip(xs, phi_vals, deltas, entropies, refs_list, ids)]
+
 
 # --- Structure Contract ---
 class StructureContract:
+    __slots__ = ('name', 'delta_thresh', 'entropy_thresh', 'action', 'priority', 'layer',
+                 'depends_on', 'ttl', 'activation_count')
+
     def __init__(self, name, delta_thresh, entropy_thresh, action,
                  priority=0, layer=0, depends_on: Optional[str] = None, ttl: int = -1):
         self.name = name
@@ -59,26 +80,35 @@ class StructureContract:
 
 # --- Structure Virtual Machine ---
 class StructureVM:
-    def __init__(self):
+    def __init__(self, min_path_len: int = 2):
         self.contracts: List[StructureContract] = []
+        # Contracts never match single-node paths; pass 1 to dispatch them anyway
+        self.min_path_len = min_path_len
+        self._dirty = False
         self.history = []
         self.reward_pool = 0
         self.events = []
         self.executed_contracts = set()
         self.first_trigger_rounds = []
         self.block_times = []
+        # Only the last DAG shape is kept; reuse is needed across consecutive rounds
+        self._paths_cache: Optional[tuple] = None
 
     def add_contract(self, contract: StructureContract):
         self.contracts.append(contract)
-        self.contracts.sort(key=lambda c: (-c.layer, -c.priority))
+        self._dirty = True
 
     def run(self, dag: Dict[str, StructureUTXO], round_number: int):
+        if self._dirty:
+            self.contracts.sort(key=lambda c: (-c.layer, -c.priority))
+            self._dirty = False
         results = []
-        paths = self.find_paths(dag)
         first_trigger_round = None
         round_start_time = time.time()
 
-        for path in paths:
+        # Paths are streamed straight into contract dispatch rather than collected first
+        for path in self.find_paths(dag):
+            path_ids = [u.id for u in path]
             for contract in self.contracts:
                 if contract.ttl != -1 and contract.activation_count >= contract.ttl:
                     self.events.append(f"[EXPIRED] Contract {contract.name} has reached TTL")
@@ -87,7 +117,7 @@ class StructureVM:
                     self.events.append(f"[WAIT] Contract {contract.name} waits on {contract.depends_on}")
                     continue
                 result = contract.execute(path)
-                self.history.append((contract.name, [u.id for u in path], result))
+                self.history.append((contract.name, path_ids, result))
                 if isinstance(result, str) and result.startswith("Reward"):
                     self.reward_pool += 10
                     self.executed_contracts.add(contract.name)
@@ -95,34 +125,56 @@ class StructureVM:
                         first_trigger_round = round_number
                         block_time = time.time() - round_start_time
                         self.block_times.append(block_time)
-                    self.events.append(f"[Layer {contract.layer}] Reward triggered by {[u.id for u in path]}")
+                    self.events.append(f"[Layer {contract.layer}] Reward triggered by {path_ids}")
                 elif isinstance(result, str) and result.startswith("Skipped"):
-                    self.events.append(f"[Layer {contract.layer}] Contract skipped on {[u.id for u in path]} — {result}")
+                    self.events.append(f"[Layer {contract.layer}] Contract skipped on {path_ids} — {result}")
                 else:
                     self.executed_contracts.add(contract.name)
-                    self.events.append(f"[Layer {contract.layer}] Executed {contract.name} on {[u.id for u in path]}")
+                    self.events.append(f"[Layer {contract.layer}] Executed {contract.name} on {path_ids}")
                 results.append((contract.name, path, result))
 
         self.first_trigger_rounds.append(first_trigger_round or -1)
         return results
 
     def find_paths(self, dag):
-        paths = []
+        # Paths refer to UTXOs by position in dag order, so rounds that rebuild a
+        # structurally identical DAG (only δ/H shift) can reuse them keyed on ids + refs
+        # and the minimum emitted path length
+        utxos = list(dag.values())
+        dag_sig = (self.min_path_len, tuple((u.id, tuple(u.refs)) for u in utxos))
+        if self._paths_cache is not None and self._paths_cache[0] == dag_sig:
+            for path_idx in self._paths_cache[1]:
+                yield [utxos[i] for i in path_idx]
+            return
 
-        def dfs(current_path, visited):
-            last = current_path[-1]
-            paths.append(current_path[:])
-            for utxo in dag.values():
-                if utxo.id in visited:
+        paths = []
+        children = defaultdict(list)
+        for i, utxo in enumerate(utxos):
+            for ref in set(utxo.refs):
+                children[ref].append(i)
+
+        for root, utxo in enumerate(utxos):
+            if utxo.refs:
+                continue
+            path, visited = [], set()
+            stack = [root]
+            while stack:
+                i = stack.pop()
+                if i is None:
+                    # Sentinel: all descendants of path[-1] have been emitted
+                    visited.remove(path.pop())
                     continue
-                if last.id in utxo.refs:
-                    dfs(current_path + [utxo], visited | {utxo.id})
-
-        for utxo in dag.values():
-            if not utxo.refs:
-                dfs([utxo], {utxo.id})
-
-        return paths
+                path.append(i)
+                visited.add(i)
+                if len(path) >= self.min_path_len:
+                    paths.append(path[:])
+                    yield [utxos[j] for j in path]
+                stack.append(None)
+                for child in reversed(children[utxos[i].id]):
+                    if child not in visited:
+                        stack.append(child)
+
+        self._paths_cache = (dag_sig, paths)
 
     def print_summary(self):
         print("\n--- Convergence Summary ---")
@@ -159,14 +211,14 @@ if __name__ == "__main__":
     for round_num in range(10):
         base_delta = 0.5
         base_entropy = 0.3
-        dag = {}
-        prev_id = None
-        for i in range(10):
-            delta = base_delta - i * 0.05 + (round_num * 0.01)
-            entropy = base_entropy + i * 0.12
-            utxo = StructureUTXO(x=i, phi_val=0.5 - i * 0.01, delta=delta, entropy=entropy, refs=[prev_id] if prev_id else [])
-            dag[utxo.id] = utxo
-            prev_id = utxo.id
+        utxos = StructureUTXO.create_batch(
+            xs=range(10),
+            phi_vals=[0.5 - i * 0.01 for i in range(10)],
+            deltas=[base_delta - i * 0.05 + (round_num * 0.01) for i in range(10)],
+            entropies=[base_entropy + i * 0.12 for i in range(10)],
+            refs_list=[[i - 1] if i else [] for i in range(10)]
+        )
+        dag = {u.id: u for u in utxos}
         vm.run(dag, round_num + 1)
 
     vm.print_summary()
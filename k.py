@@ -1,56 +1,102 @@
 # Re-imports after environment reset
 import hashlib
+import functools
 import hmac
 import math
 import os
 import random
-from typing import List, Tuple
+import struct
+import numpy as np
+from typing import List, Tuple, Union
 import matplotlib.pyplot as plt
 
 # === Structure Function Utilities ===
 
+# HMAC-SHA256 key state is constant, so absorb the padded key once and clone it per call
+_HMAC_KEY = b'structkey'.ljust(64, b'\x00')
+_IPAD_CTX = hashlib.sha256(bytes(b ^ 0x36 for b in _HMAC_KEY))
+_OPAD_CTX = hashlib.sha256(bytes(b ^ 0x5c for b in _HMAC_KEY))
+
+def _hmac_block(msg: bytes) -> bytes:
+    inner = _IPAD_CTX.copy()
+    inner.update(msg)
+    outer = _OPAD_CTX.copy()
+    outer.update(inner.digest())
+    return outer.digest()
+
 def derive_parameters(seed: bytes) -> Tuple[List[float], List[float], List[float]]:
-    key = b'structkey'
-    raw = b''.join([hmac.new(key, seed + bytes([i]), hashlib.sha256).digest() for i in range(3)])
-    floats = [float.fromhex(hex(int.from_bytes(raw[i:i+4], 'big'))) for i in range(0, 48, 4)]
+    raw = b''.join([_hmac_block(seed + bytes([i])) for i in range(3)])
+    floats = [float(u) for u in struct.unpack_from('>12I', raw)]
     A = [1 + abs(floats[i]) % 2 for i in range(3)]
     t = [0.5 + abs(floats[i]) % 20 for i in range(3, 6)]
     theta = [abs(floats[i]) % (2 * math.pi) for i in range(6, 9)]
     return A, t, theta
 
+def phi_precomp(log_x1: float, A: List[float], t: List[float], theta: List[float]) -> float:
+    return sum(A[i] * math.cos(t[i] * log_x1 + theta[i]) for i in range(3))
+
 def phi(x: int, A: List[float], t: List[float], theta: List[float]) -> float:
-    return sum(A[i] * math.cos(t[i] * math.log(x + 1) + theta[i]) for i in range(3))
+    return phi_precomp(math.log(x + 1), A, t, theta)
+
+def phi_batch(log_xs, A, t, theta):
+    return (A[:, None, :] * np.cos(t[:, None, :] * log_xs[None, :, None] + theta[:, None, :])).sum(-1)
 
 def structure_hash(message: bytes) -> int:
     return int.from_bytes(hashlib.sha256(message).digest(), 'big')
 
+_CHALLENGE_XS = (101, 211, 307)
+_CHALLENGE_LOGS = tuple(math.log(x + 1) for x in _CHALLENGE_XS)
+
+@functools.lru_cache(maxsize=256)
+def _message_xm(message: str, D: int) -> int:
+    return structure_hash(message.encode()) % D
+
+@functools.lru_cache(maxsize=256)
+def _challenge_phi(A: Tuple[float, ...], t: Tuple[float, ...], theta: Tuple[float, ...]) -> Tuple[float, ...]:
+    # φ at the challenge points depends only on the parameters, so sign and verify share it
+    return tuple(phi_precomp(log_x1, A, t, theta) for log_x1 in _CHALLENGE_LOGS)
+
 # === Signature Generation and Verification ===
 
-def generate_signature(message: str, A: List[float], t: List[float], theta: List[float], D: int = 2**24) -> Tuple[str, float, int, float]:
-    m_bytes = message.encode()
-    xm = structure_hash(m_bytes) % D
-    phi_xm = phi(xm, A, t, theta)
-    challenge_xs = [101, 211, 307]
-    phi_values = [phi(x, A, t, theta) for x in challenge_xs]
-    tau = sorted(phi_values)[1]
+def _median3(a: float, b: float, c: float) -> float:
+    # Exact median of three without building and sorting a list
+    return max(min(a, b), min(max(a, b), c))
+
+def _sign_bytes(xm: int, phi_xm: float, delta: float) -> bytes:
+    return hashlib.sha256(f"{xm}|{phi_xm}|{delta}".encode()).digest()
+
+def _sign_from_xm(xm: int, A: List[float], t: List[float], theta: List[float]) -> Tuple[str, float, float]:
+    phi_xm = phi_precomp(math.log(xm + 1), A, t, theta)
+    phi_values = _challenge_phi(tuple(A), tuple(t), tuple(theta))
+    a, b, c = phi_values
+    tau = _median3(a, b, c)
     delta = abs(phi_xm - tau)
-    data = f"{xm}|{phi_xm}|{delta}".encode()
-    sig = hashlib.sha256(data).hexdigest()
+    sig = _sign_bytes(xm, phi_xm, delta).hex()
+    return sig, delta, tau
+
+def generate_signature(message: str, A: List[float], t: List[float], theta: List[float], D: int = 2**24) -> Tuple[str, float, int, float]:
+    xm = _message_xm(message, D)
+    sig, delta, tau = _sign_from_xm(xm, A, t, theta)
     return sig, delta, xm, tau
 
-def verify_signature(message: str, signature: str, A: List[float], t: List[float], theta: List[float], D: int = 2**24, alpha: float = 0.1) -> Tuple[bool, float]:
-    m_bytes = message.encode()
-    xm = structure_hash(m_bytes) % D
-    phi_xm = phi(xm, A, t, theta)
-    challenge_xs = [101, 211, 307]
-    phi_values = [phi(x, A, t, theta) for x in challenge_xs]
-    tau = sorted(phi_values)[1]
+def verify_signature(message: str, signature: Union[str, bytes], A: List[float], t: List[float], theta: List[float], D: int = 2**24, alpha: float = 0.1) -> Tuple[bool, float]:
+    xm = _message_xm(message, D)
+    phi_xm = phi_precomp(math.log(xm + 1), A, t, theta)
+    phi_values = _challenge_phi(tuple(A), tuple(t), tuple(theta))
+    a, b, c = phi_values
+    tau = _median3(a, b, c)
     sigma_phi = math.sqrt(sum((v - tau)**2 for v in phi_values) / 3)
     epsilon = alpha * sigma_phi
     delta = abs(phi_xm - tau)
-    data = f"{xm}|{phi_xm}|{delta}".encode()
-    expected_sig = hashlib.sha256(data).hexdigest()
-    return (delta < epsilon and expected_sig == signature), delta
+    if not isinstance(signature, (str, bytes, bytearray, memoryview)):
+        return False, delta
+    expected_sig = _sign_bytes(xm, phi_xm, delta)
+    if isinstance(signature, str):
+        # Only the canonical lowercase hex that generate_signature emits is accepted
+        if not signature.isascii():
+            return False, delta
+        expected_sig = expected_sig.hex()
+    return (delta < epsilon and hmac.compare_digest(expected_sig, signature)), delta
 
 # === Combined Test Runner ===
 
@@ -67,18 +113,23 @@ def run_combined_test(message: str, trials: int = 50):
     print(f"Signature: {sig_fixed}")
     print(f"Verification: {'VALID ✅' if valid_fixed else 'INVALID ❌'}")
 
-    deltas_random = []
-    best_delta = float("inf")
-    best_result = {}
-
-    for i in range(trials):
-        seed = os.urandom(16)
-        A, t, theta = derive_parameters(seed)
-        sig, delta, xm, tau = generate_signature(message, A, t, theta)
-        deltas_random.append(delta)
-        if delta < best_delta:
-            best_delta = delta
-            best_result = {"seed": seed.hex(), "delta": delta, "signature": sig, "A": A, "t": t, "theta": theta}
+    # Evaluate φ for every trial at once; only the winning seed is signed
+    seeds = [os.urandom(16) for _ in range(trials)]
+    params = [derive_parameters(seed) for seed in seeds]
+    A_arr = np.array([p[0] for p in params])
+    t_arr = np.array([p[1] for p in params])
+    theta_arr = np.array([p[2] for p in params])
+    xm = _message_xm(message, D)
+    logs = np.array((math.log(xm + 1),) + _CHALLENGE_LOGS)
+    phi_mat = phi_batch(logs, A_arr, t_arr, theta_arr)
+    a, b, c = phi_mat[:, 1], phi_mat[:, 2], phi_mat[:, 3]
+    tau_arr = np.maximum(np.minimum(a, b), np.minimum(np.maximum(a, b), c))
+    deltas_random = np.abs(phi_mat[:, 0] - tau_arr)
+
+    best = int(np.argmin(deltas_random))
+    A, t, theta = params[best]
+    sig, delta, tau = _sign_from_xm(xm, A, t, theta)
+    best_result = {"seed": seeds[best].hex(), "delta": delta, "signature": sig, "A": A, "t": t, "theta": theta}
 
     valid_best, _ = verify_signature(message, best_result["signature"], best_result["A"], best_result["t"], best_result["theta"])
 
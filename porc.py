@@ -2,26 +2,47 @@
 
 import math
 import hashlib
+import struct
 from typing import List, Dict, Optional
 from collections import defaultdict
 
+_sha256 = hashlib.sha256
+
+
+def _utxo_id(x, phi_val) -> str:
+    return _sha256(struct.pack("<dd", float(x), float(phi_val))).digest()[:4].hex()
+
+
 # --- Structure UTXO Definition ---
 class StructureUTXO:
-    def __init__(self, x, phi_val, delta, entropy, refs):
+    __slots__ = ('x', 'phi', 'delta', 'entropy', 'refs', 'id', 'locked')
+
+    def __init__(self, x, phi_val, delta, entropy, refs, utxo_id: Optional[str] = None):
         self.x = x
         self.phi = phi_val
         self.delta = delta
         self.entropy = entropy
         self.refs = refs
-        self.id = hashlib.sha256(f"{x}{phi_val}".encode()).hexdigest()[:8]
+        self.id = utxo_id or _utxo_id(x, phi_val)
         self.locked = False  # example DAG-mutated flag
 
     def __repr__(self):
         return f"<ψ-{self.id} | δ={self.delta:.4f} | H={self.entropy:.2f}>"
 
+    @classmethod
+    def create_batch(cls, xs, phi_vals, deltas, entropies, refs_list):
+        # refs_list entries are positions of earlier UTXOs within the same batch
+        ids = [_utxo_id(x, phi_val) for x, phi_val in zip(xs, phi_vals)]
+        return [cls(x, phi_val, delta, entropy, [ids[r] for r in refs], utxo_id=utxo_id)
+                for x, phi_val, delta, entropy, refs, utxo_id
+                in zip(xs, phi_vals, deltas, entropies, refs_list, ids)]
+
 
 # --- Structure Contract with Pattern Matching and DAG Mutation ---
 class StructureContract:
+    __slots__ = ('name', 'delta_thresh', 'entropy_thresh', 'action', 'priority', 'layer',
+                 'depends_on', 'ttl', 'activation_count')
+
     def __init__(self, name, delta_thresh, entropy_thresh, action,
                  priority=0, layer=0, depends_on: Optional[str] = None, ttl: int = -1):
         self.name = name
@@ -58,9 +79,12 @@ class StructureContract:
 
 # --- Structure Virtual Machine ---
 class StructureVM:
-    def __init__(self, dag: Dict[str, StructureUTXO]):
+    def __init__(self, dag: Dict[str, StructureUTXO], min_path_len: int = 2):
         self.dag = dag
         self.contracts: List[StructureContract] = []
+        # Contracts never match single-node paths; pass 1 to dispatch them anyway
+        self.min_path_len = min_path_len
+        self._dirty = False
         self.history = []
         self.reward_pool = 0
         self.events = []
@@ -69,14 +93,18 @@ class StructureVM:
 
     def add_contract(self, contract: StructureContract):
         self.contracts.append(contract)
-        self.contracts.sort(key=lambda c: (-c.layer, -c.priority))
+        self._dirty = True
 
     def run(self):
+        if self._dirty:
+            self.contracts.sort(key=lambda c: (-c.layer, -c.priority))
+            self._dirty = False
         results = []
-        paths = self.find_paths()
         self.round += 1
 
-        for path in paths:
+        # Paths are streamed straight into contract dispatch rather than collected first
+        for path in self.find_paths():
+            path_ids = [u.id for u in path]
             for contract in self.contracts:
                 if contract.ttl != -1 and contract.activation_count >= contract.ttl:
                     self.events.append(f"[EXPIRED] Contract {contract.name} has reached TTL")
@@ -85,37 +113,45 @@ class StructureVM:
                     self.events.append(f"[WAIT] Contract {contract.name} waits on {contract.depends_on}")
                     continue
                 result = contract.execute(path)
-                self.history.append((contract.name, [u.id for u in path], result))
+                self.history.append((contract.name, path_ids, result))
                 if isinstance(result, str) and result.startswith("Reward"):
                     self.reward_pool += 10
-                    self.events.append(f"[Layer {contract.layer}] Reward triggered by {[u.id for u in path]}")
+                    self.events.append(f"[Layer {contract.layer}] Reward triggered by {path_ids}")
                     self.executed_contracts.add(contract.name)
                 elif isinstance(result, str) and result.startswith("Skipped"):
-                    self.events.append(f"[Layer {contract.layer}] Contract skipped on {[u.id for u in path]} — {result}")
+                    self.events.append(f"[Layer {contract.layer}] Contract skipped on {path_ids} — {result}")
                 else:
-                    self.events.append(f"[Layer {contract.layer}] Executed {contract.name} on {[u.id for u in path]}")
+                    self.events.append(f"[Layer {contract.layer}] Executed {contract.name} on {path_ids}")
                     self.executed_contracts.add(contract.name)
                 results.append((contract.name, path, result))
 
         return results
 
     def find_paths(self):
-        paths = []
-
-        def dfs(current_path, visited):
-            last = current_path[-1]
-            paths.append(current_path[:])
-            for utxo in self.dag.values():
-                if utxo.id in visited:
-                    continue
-                if last.id in utxo.refs:
-                    dfs(current_path + [utxo], visited | {utxo.id})
-
+        children = defaultdict(list)
         for utxo in self.dag.values():
-            if not utxo.refs:
-                dfs([utxo], {utxo.id})
-
-        return paths
+            for ref in set(utxo.refs):
+                children[ref].append(utxo)
+
+        for root in list(self.dag.values()):
+            if root.refs:
+                continue
+            path, visited = [], set()
+            stack = [root]
+            while stack:
+                utxo = stack.pop()
+                if utxo is None:
+                    # Sentinel: all descendants of path[-1] have been emitted
+                    visited.remove(path.pop().id)
+                    continue
+                path.append(utxo)
+                visited.add(utxo.id)
+                if len(path) >= self.min_path_len:
+                    yield path[:]
+                stack.append(None)
+                for child in reversed(children[utxo.id]):
+                    if child.id not in visited:
+                        stack.append(child)
 
     def print_history(self):
         print(f"\n--- Contract Execution History (Round {self.round}) ---")
@@ -130,10 +166,14 @@ class StructureVM:
 
 # --- Test Example ---
 if __name__ == "__main__":
-    utxo1 = StructureUTXO(x=1, phi_val=0.5, delta=0.2, entropy=0.95, refs=[])
-    utxo2 = StructureUTXO(x=2, phi_val=0.3, delta=0.1, entropy=0.96, refs=[utxo1.id])
-    utxo3 = StructureUTXO(x=3, phi_val=0.7, delta=0.4, entropy=0.97, refs=[utxo2.id])
-    dag = {u.id: u for u in [utxo1, utxo2, utxo3]}
+    utxos = StructureUTXO.create_batch(
+        xs=[1, 2, 3],
+        phi_vals=[0.5, 0.3, 0.7],
+        deltas=[0.2, 0.1, 0.4],
+        entropies=[0.95, 0.96, 0.97],
+        refs_list=[[], [0], [1]]
+    )
+    dag = {u.id: u for u in utxos}
 
     def reward_action(utxos):
         return f"Reward granted to {[u.id for u in utxos]}"
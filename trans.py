@@ -2,20 +2,29 @@
 
 import math
 import hashlib
-import time
+import struct
 from typing import List, Dict, Optional
 from collections import defaultdict
 
+_sha256 = hashlib.sha256
+
+
+def _utxo_id(x, phi_val) -> str:
+    return _sha256(struct.pack("<dd", float(x), float(phi_val))).digest()[:4].hex()
+
+
 # --- Structure UTXO Definition ---
 class StructureUTXO:
-    def __init__(self, x, phi_val, delta, entropy, refs, owner):
+    __slots__ = ('x', 'phi', 'delta', 'entropy', 'refs', 'owner', 'id', 'locked', 'value', 'spent', 'provenance')
+
+    def __init__(self, x, phi_val, delta, entropy, refs, owner, utxo_id: Optional[str] = None):
         self.x = x
         self.phi = phi_val
         self.delta = delta
         self.entropy = entropy
         self.refs = refs
         self.owner = owner
-        self.id = hashlib.sha256(f"{x}{phi_val}".encode()).hexdigest()[:8]
+        self.id = utxo_id or _utxo_id(x, phi_val)
         self.locked = False
         self.value = 10
         self.spent = False  # NEW: prevent reuse
@@ -24,12 +33,24 @@ class StructureUTXO:
     def __repr__(self):
         return f"<ψ-{self.id} | δ={self.delta:.4f} | H={self.entropy:.2f} | owner={self.owner} | value={self.value} | spent={self.spent}>"
 
+    @classmethod
+    def create_batch(cls, xs, phi_vals, deltas, entropies, refs_list, owners=None):
+        # refs_list entries are positions of earlier UTXOs within the same batch
+        ids = [_utxo_id(x, phi_val) for x, phi_val in zip(xs, phi_vals)]
+        owners = owners if owners is not None else [None] * len(ids)
+        return [cls(x, phi_val, delta, entropy, [ids[r] for r in refs], owner, utxo_id=utxo_id)
+                for x, phi_val, delta, entropy, refs, owner, utxo_id
+                in zip(xs, phi_vals, deltas, entropies, refs_list, owners, ids)]
+
 
 wallet_balances = defaultdict(int)
 total_supply = 0
 
 
 class StructureContract:
+    __slots__ = ('name', 'delta_thresh', 'entropy_thresh', 'action', 'priority', 'layer',
+                 'depends_on', 'ttl', 'activation_count')
+
     def __init__(self, name, delta_thresh, entropy_thresh, action,
                  priority=0, layer=0, depends_on: Optional[str] = None, ttl: int = -1):
         self.name = name
@@ -55,7 +76,6 @@ class StructureContract:
         return True, "OK"
 
     def execute(self, utxos):
-        time.sleep(0.01)
         passed, reason = self.check(utxos)
         if passed:
             self.activation_count += 1
@@ -97,37 +117,51 @@ def transfer_action(utxos):
 
 
 class StructureVM:
-    def __init__(self):
+    def __init__(self, min_path_len: int = 2):
         self.contracts: List[StructureContract] = []
+        # Contracts never match single-node paths; pass 1 to dispatch them anyway
+        self.min_path_len = min_path_len
+        self._dirty = False
 
     def add_contract(self, contract: StructureContract):
         self.contracts.append(contract)
-        self.contracts.sort(key=lambda c: (-c.layer, -c.priority))
+        self._dirty = True
 
     def run(self, dag: Dict[str, StructureUTXO]):
-        paths = self.find_paths(dag)
-        for path in paths:
+        if self._dirty:
+            self.contracts.sort(key=lambda c: (-c.layer, -c.priority))
+            self._dirty = False
+        # Paths are streamed straight into contract dispatch rather than collected first
+        for path in self.find_paths(dag):
             for contract in self.contracts:
                 result = contract.execute(path)
                 print(f"[{contract.name}] {path} => {result}")
 
     def find_paths(self, dag):
-        paths = []
-
-        def dfs(current_path, visited):
-            last = current_path[-1]
-            paths.append(current_path[:])
-            for utxo in dag.values():
-                if utxo.id in visited:
-                    continue
-                if last.id in utxo.refs:
-                    dfs(current_path + [utxo], visited | {utxo.id})
-
+        children = defaultdict(list)
         for utxo in dag.values():
-            if not utxo.refs:
-                dfs([utxo], {utxo.id})
-
-        return paths
+            for ref in set(utxo.refs):
+                children[ref].append(utxo)
+
+        for root in list(dag.values()):
+            if root.refs:
+                continue
+            path, visited = [], set()
+            stack = [root]
+            while stack:
+                utxo = stack.pop()
+                if utxo is None:
+                    # Sentinel: all descendants of path[-1] have been emitted
+                    visited.remove(path.pop().id)
+                    continue
+                path.append(utxo)
+                visited.add(utxo.id)
+                if len(path) >= self.min_path_len:
+                    yield path[:]
+                stack.append(None)
+                for child in reversed(children[utxo.id]):
+                    if child.id not in visited:
+                        stack.append(child)
 
 
 # --- Test Wallet Transfer with Provenance ---
@@ -142,16 +176,18 @@ if __name__ == "__main__":
     vm = StructureVM()
     vm.add_contract(contract)
 
+    utxos = StructureUTXO.create_batch(
+        xs=range(5),
+        phi_vals=[0.5 - i * 0.01 for i in range(5)],
+        deltas=[0.2 - i * 0.01 for i in range(5)],
+        entropies=[0.8 + i * 0.02 for i in range(5)],
+        refs_list=[[i - 1] if i else [] for i in range(5)],
+        owners=["a" if i < 4 else "b" for i in range(5)]
+    )
     dag = {}
-    prev_id = None
-    for i in range(5):
-        delta = 0.2 - i * 0.01
-        entropy = 0.8 + i * 0.02
-        owner = "a" if i < 4 else "b"
-        utxo = StructureUTXO(x=i, phi_val=0.5 - i * 0.01, delta=delta, entropy=entropy, refs=[prev_id] if prev_id else [], owner=owner)
+    for utxo in utxos:
         dag[utxo.id] = utxo
-        prev_id = utxo.id
-        wallet_balances[owner] += utxo.value
+        wallet_balances[utxo.owner] += utxo.value
         total_supply += utxo.value
 
     print("Initial Balances:", dict(wallet_balances))